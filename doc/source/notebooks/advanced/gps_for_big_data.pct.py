@@ -97,8 +97,9 @@ elbo(tensor_data)
 minibatch_size = 100
 
 train_dataset = tf.data.Dataset.from_tensor_slices((X, Y)).repeat().shuffle(N)
+autotune = tf.data.experimental.AUTOTUNE
 
-train_iter = iter(train_dataset.batch(minibatch_size))
+train_iter = iter(train_dataset.batch(minibatch_size).prefetch(autotune))
 
 ground_truth = elbo(tensor_data).numpy()
 
@@ -197,7 +198,7 @@ def run_adam(model, iterations):
     """
     # Create an Adam Optimizer action
     logf = []
-    train_iter = iter(train_dataset.batch(minibatch_size))
+    train_iter = iter(train_dataset.batch(minibatch_size).prefetch(autotune))
     training_loss = model.training_loss_closure(train_iter, compile=True)
     optimizer = tf.optimizers.Adam()
 
@@ -21,13 +21,17 @@
 # %%
 import warnings
 import numpy as np
+from scipy.cluster.vq import kmeans2
 import gpflow
 import tensorflow as tf
 
-from gpflow.ci_utils import ci_niter, ci_range
+from gpflow.ci_utils import ci_niter
 from gpflow.models import VGP, GPR, SGPR, SVGP
 from gpflow.optimizers import NaturalGradient
 from gpflow.optimizers.natgrad import XiSqrtMeanVar
+from gpflow.config import default_jitter
+from gpflow.conditionals import base_conditional_with_lm
+from gpflow.covariances import Kuf, Kuu
 from gpflow import set_trainable
 
 # %matplotlib inline
@@ -46,10 +50,14 @@ x = np.random.uniform(size=(N, D))
 y = np.sin(10 * x[:, :1]) + 5 * x[:, 1:] ** 2
 
 data = (x, y)
-inducing_variable = tf.random.uniform((M, D))
+# initialize the inducing points at k-means cluster centres of the inputs rather than at random
+inducing_variable = kmeans2(x, M, minit="points")[0]
 adam_learning_rate = 0.01
 iterations = ci_niter(5)
-autotune = tf.data.experimental.AUTOTUNE
+
+# We use a single natural gradient optimizer throughout this notebook. It keeps its step length
+# gamma in a variable, so that changing it does not require re-tracing compiled optimization steps.
+natgrad_opt = NaturalGradient(gamma=1.0)
 
 # %% [markdown]
 # ### VGP is a GPR
@@ -89,7 +97,6 @@ vgp.elbo().numpy()
 # In fact, we only need to take **one step** in the natural gradient direction to recover the exact posterior:
 
 # %%
-natgrad_opt = NaturalGradient(gamma=1.0)
 variational_params = [(vgp.q_mu, vgp.q_sqrt)]
 natgrad_opt.minimize(vgp.training_loss, var_list=variational_params)
 
@@ -102,7 +109,7 @@ vgp.elbo().numpy()
 # %% [markdown]
 # ### Optimize both variational parameters and kernel hyperparameters together
 #
-# In the Gaussian likelihood case we can iterate between an Adam update for the hyperparameters and a NatGrad update for the variational parameters. That way, we achieve optimization of hyperparameters as if the model were a GPR.
+# In the Gaussian likelihood case we can combine an Adam update for the hyperparameters with a NatGrad update for the variational parameters in every iteration. That way, we achieve optimization of hyperparameters as if the model were a GPR.
 
 # %% [markdown]
 # The trick is to forbid Adam from updating the variational parameters by setting them to not trainable.
@@ -115,18 +122,76 @@ set_trainable(vgp.q_sqrt, False)
 adam_opt_for_vgp = tf.optimizers.Adam(adam_learning_rate)
 adam_opt_for_gpr = tf.optimizers.Adam(adam_learning_rate)
 
+# %% [markdown]
+# Calling `minimize()` on both optimizers in turn would evaluate the loss and its gradients twice per iteration. Instead, we compute the loss once under a single `tf.GradientTape`, and hand the gradients with respect to the variational parameters to the natural gradient step and the remaining gradients to Adam.
+#
+# Note that this makes the two updates simultaneous rather than alternating: both use the gradients at the current variational distribution $q(u)$, so Adam does not see the $q(u)$ that the natural gradient step has just produced. The hyperparameters therefore lag one natural gradient step behind, which makes no difference to where the optimization converges:
+
+
+# %%
+def joint_step(loss_fn, natgrad_opt, adam_opt, variational_params, hyper_vars):
+    q_mus = [params[0] for params in variational_params]
+    q_sqrts = [params[1] for params in variational_params]
+    xi_transforms = [params[2] if len(params) > 2 else None for params in variational_params]
+
+    with tf.GradientTape(watch_accessed_variables=False) as tape:
+        tape.watch([p.unconstrained_variable for p in q_mus + q_sqrts])
+        tape.watch(hyper_vars)
+        loss = loss_fn()
+
+    q_mu_grads, q_sqrt_grads, hyper_grads = tape.gradient(loss, [q_mus, q_sqrts, hyper_vars])
+
+    for q_mu_grad, q_sqrt_grad, q_mu, q_sqrt, xi_transform in zip(
+        q_mu_grads, q_sqrt_grads, q_mus, q_sqrts, xi_transforms
+    ):
+        natgrad_opt._natgrad_apply_gradients(q_mu_grad, q_sqrt_grad, q_mu, q_sqrt, xi_transform)
+    adam_opt.apply_gradients(zip(hyper_grads, hyper_vars))
+    return loss
+
+
+# %% [markdown]
+# Each training step is wrapped in `tf.function`, so that it is compiled into a single graph once and not re-executed op-by-op from Python in every iteration.
+#
+# The steps return the training loss they computed for the gradient, so that we can print the (negative) loss without evaluating the model objective a second time. Note that this is the objective *before* the update of that iteration, so the first printed value is the one of the initial model:
+
+
+# %%
+def adam_step(loss_fn, adam_opt, variables):
+    with tf.GradientTape(watch_accessed_variables=False) as tape:
+        tape.watch(variables)
+        loss = loss_fn()
+    grads = tape.gradient(loss, variables)
+    adam_opt.apply_gradients(zip(grads, variables))
+    return loss
+
+
+@tf.function
+def gpr_step():
+    return adam_step(gpr.training_loss, adam_opt_for_gpr, gpr.trainable_variables)
+
+
+@tf.function
+def vgp_step():
+    return joint_step(
+        vgp.training_loss,
+        natgrad_opt,
+        adam_opt_for_vgp,
+        [(vgp.q_mu, vgp.q_sqrt)],
+        vgp.trainable_variables,
+    )
+
+
 # %%
 for i in range(iterations):
-    adam_opt_for_gpr.minimize(gpr.training_loss, var_list=gpr.trainable_variables)
-    likelihood = gpr.log_marginal_likelihood()
-    tf.print(f"GPR with Adam: iteration {i + 1} likelihood {likelihood:.04f}")
+    loss = gpr_step()
+    tf.print(f"GPR with Adam: likelihood before iteration {i + 1}: {-loss:.04f}")
 
 # %%
 for i in range(iterations):
-    natgrad_opt.minimize(vgp.training_loss, var_list=variational_params)
-    adam_opt_for_vgp.minimize(vgp.training_loss, var_list=vgp.trainable_variables)
-    likelihood = vgp.elbo()
-    tf.print(f"VGP with NaturalGradient and Adam: iteration {i + 1} likelihood {likelihood:.04f}")
+    loss = vgp_step()
+    tf.print(
+        f"VGP with NaturalGradient and Adam: likelihood before iteration {i + 1}: {-loss:.04f}"
+    )
 
 # %% [markdown]
 # Compare GPR and VGP lengthscales after optimization:
@@ -144,13 +209,19 @@ print(f"VGP lengthscales = {vgp.kernel.lengthscales.numpy():.04f}")
 # %%
 svgp = SVGP(
     kernel=gpflow.kernels.Matern52(),
-    likelihood=gpflow.likelihoods.Gaussian(),
+    likelihood=gpflow.likelihoods.Gaussian(variance=0.1),
+    inducing_variable=inducing_variable,
+)
+sgpr = SGPR(
+    data,
+    kernel=gpflow.kernels.Matern52(),
     inducing_variable=inducing_variable,
+    noise_variance=0.1,
 )
-sgpr = SGPR(data, kernel=gpflow.kernels.Matern52(), inducing_variable=inducing_variable)
 
+# the likelihood variance stays fixed in this demonstration
 for model in svgp, sgpr:
-    model.likelihood.variance.assign(0.1)
+    set_trainable(model.likelihood, False)
 
 # %% [markdown]
 # Analytically optimal sparse model ELBO:
@@ -166,8 +237,6 @@ svgp.elbo(data).numpy()
 
 # %%
 variational_params = [(svgp.q_mu, svgp.q_sqrt)]
-
-natgrad_opt = NaturalGradient(gamma=1.0)
 natgrad_opt.minimize(svgp.training_loss_closure(data), var_list=variational_params)
 
 # %% [markdown]
@@ -180,29 +249,79 @@ svgp.elbo(data).numpy()
 # ### Minibatches
 # A crucial property of the natural gradient method is that it still works with minibatches.
 # In practice though, we need to use a smaller gamma.
+#
+# As the whole dataset easily fits in memory, we place it on the device once and draw each minibatch by indexing into it, rather than going through a `tf.data` pipeline:
 
 # %%
-natgrad_opt = NaturalGradient(gamma=0.1)
+natgrad_opt.gamma.assign(0.1)
+
+data_t = (tf.constant(x), tf.constant(y))
+
+
+@tf.function
+def sample_batch(data):
+    X, Y = data
+    idx = tf.random.uniform([batch_size], 0, N, dtype=tf.int32)
+    return tf.gather(X, idx), tf.gather(Y, idx)
 
-data_minibatch = (
-    tf.data.Dataset.from_tensor_slices(data)
-    .prefetch(autotune)
-    .repeat()
-    .shuffle(N)
-    .batch(batch_size)
-)
-data_minibatch_it = iter(data_minibatch)
 
+# %% [markdown]
+# Here we only optimize the variational parameters, so the kernel hyperparameters and inducing inputs stay fixed. Hence $K_{uu}$ and its Cholesky factor do not change between steps, and we compute the factor only once and reuse it in every evaluation of the ELBO (as we did not set `num_data`, the minibatch ELBO is not rescaled):
+
+
+# %%
+def svgp_elbo_with_lm(model, data, Lm):
+    X, Y = data
+    Kmn = Kuf(model.inducing_variable, model.kernel, X)
+    Knn = model.kernel(X, full_cov=False)
+    f_mean, f_var = base_conditional_with_lm(
+        Kmn, Lm, Knn, model.q_mu, q_sqrt=model.q_sqrt, white=model.whiten
+    )
+    f_mean += model.mean_function(X)
+    var_exp = model.likelihood.variational_expectations(f_mean, f_var, Y)
+    return tf.reduce_sum(var_exp) - model.prior_kl()
+
+
+svgp_Lm = tf.linalg.cholesky(Kuu(svgp.inducing_variable, svgp.kernel, jitter=default_jitter()))
+
+
+def svgp_step(batch):
+    natgrad_opt.minimize(
+        lambda: -svgp_elbo_with_lm(svgp, batch, svgp_Lm), var_list=[(svgp.q_mu, svgp.q_sqrt)]
+    )
+
+
+# %% [markdown]
+# For these longer optimizations we compile the whole loop, rather than the individual steps, with `tf.function`. TensorFlow turns the loop over `tf.range` into a `tf.while_loop`, so that all iterations are executed in one graph call rather than being dispatched one by one from Python:
+
+
+# %%
+@tf.function
+def svgp_loop(num_steps):
+    for _ in tf.range(num_steps):
+        svgp_step(sample_batch(data_t))
+
+
+svgp_loop(ci_niter(100))
+
+# %% [markdown]
+# To estimate the average minibatch ELBO, we do not need to evaluate each minibatch separately: the ELBO of a minibatch is the sum of the variational expectations over its points minus the KL term (again without rescaling, as `num_data` is not set). We can therefore draw all minibatches at once and evaluate the predictions for all of their points in a single call, which also computes the Cholesky factor of $K_{uu}$ only once:
+
+
+# %%
+def average_minibatch_elbo(model, data, num_batches):
+    idx = tf.random.uniform([num_batches * batch_size], 0, N, dtype=tf.int32)
+    X, Y = tf.gather(data[0], idx), tf.gather(data[1], idx)
+    f_mean, f_var = model.predict_f(X)
+    var_exp = model.likelihood.variational_expectations(f_mean, f_var, Y)
+    return tf.reduce_sum(var_exp) / num_batches - model.prior_kl()
 
-svgp_objective = svgp.training_loss_closure(data_minibatch_it)
-for _ in range(ci_niter(100)):
-    natgrad_opt.minimize(svgp_objective, var_list=variational_params)
 
 # %% [markdown]
 # Minibatch SVGP ELBO after NatGrad optimization:
 
 # %%
-np.average([svgp.elbo(next(data_minibatch_it)) for _ in ci_range(100)])
+average_minibatch_elbo(svgp, data_t, ci_niter(100)).numpy()
 
 # %% [markdown]
 # ### Comparison with ordinary gradients in the conjugate case
@@ -214,8 +333,16 @@ np.average([svgp.elbo(next(data_minibatch_it)) for _ in ci_range(100)])
 # Here we'll do hyperparameter learning together with optimization of the variational parameters, comparing the interleaved natural gradient approach and the one using ordinary gradients for the hyperparameters and variational parameters jointly.
 #
 # **NOTE:** Again we need to compromise for smaller gamma value, which we'll keep *fixed* during the optimization.
+#
+# Neither of these stochastic optimizations needs double precision, so we build and train both models in single precision (`float32`), which halves the memory traffic of the matrix operations and doubles the SIMD throughput. Single precision needs a larger jitter to keep the Cholesky decompositions stable. We restore the double-precision configuration at the end of this section.
 
 # %%
+float64_config = gpflow.config.config()
+gpflow.config.set_default_float(np.float32)
+gpflow.config.set_default_jitter(1e-4)
+
+data_t_float32 = tuple(gpflow.utilities.to_default_float(t) for t in data_t)
+
 svgp_ordinary = SVGP(
     kernel=gpflow.kernels.Matern52(),
     likelihood=gpflow.likelihoods.Gaussian(),
@@ -237,47 +364,57 @@ set_trainable(svgp_natgrad.q_sqrt, False)
 
 # Create the optimize_tensors for SVGP
 natgrad_adam_opt = tf.optimizers.Adam(adam_learning_rate)
-
-natgrad_opt = NaturalGradient(gamma=0.1)
-variational_params = [(svgp_natgrad.q_mu, svgp_natgrad.q_sqrt)]
+natgrad_opt.gamma.assign(0.1)
 
 # %% [markdown]
 # Let's optimize the models:
 
 # %%
-data_minibatch = (
-    tf.data.Dataset.from_tensor_slices(data)
-    .prefetch(autotune)
-    .repeat()
-    .shuffle(N)
-    .batch(batch_size)
-)
-data_minibatch_it = iter(data_minibatch)
+def svgp_ordinary_step(batch):
+    ordinary_adam_opt.minimize(
+        lambda: svgp_ordinary.training_loss(batch), var_list=svgp_ordinary.trainable_variables
+    )
+
+
+def svgp_natgrad_step(batch):
+    return joint_step(
+        lambda: svgp_natgrad.training_loss(batch),
+        natgrad_opt,
+        natgrad_adam_opt,
+        [(svgp_natgrad.q_mu, svgp_natgrad.q_sqrt)],
+        svgp_natgrad.trainable_variables,
+    )
 
 
-svgp_ordinary_loss = svgp_ordinary.training_loss_closure(data_minibatch_it)
-svgp_natgrad_loss = svgp_natgrad.training_loss_closure(data_minibatch_it)
+@tf.function
+def svgp_ordinary_loop(num_steps):
+    for _ in tf.range(num_steps):
+        svgp_ordinary_step(sample_batch(data_t_float32))
 
 
-for _ in range(ci_niter(100)):
-    ordinary_adam_opt.minimize(svgp_ordinary_loss, var_list=svgp_ordinary.trainable_variables)
+@tf.function
+def svgp_natgrad_loop(num_steps):
+    for _ in tf.range(num_steps):
+        svgp_natgrad_step(sample_batch(data_t_float32))
 
 
-for _ in range(ci_niter(100)):
-    natgrad_adam_opt.minimize(svgp_natgrad_loss, var_list=svgp_natgrad.trainable_variables)
-    natgrad_opt.minimize(svgp_natgrad_loss, var_list=variational_params)
+svgp_ordinary_loop(ci_niter(100))
+svgp_natgrad_loop(ci_niter(100))
 
 # %% [markdown]
 # SVGP ELBO after ordinary `Adam` optimization:
 
 # %%
-np.average([svgp_ordinary.elbo(next(data_minibatch_it)) for _ in ci_range(100)])
+average_minibatch_elbo(svgp_ordinary, data_t_float32, ci_niter(100)).numpy()
 
 # %% [markdown]
 # SVGP ELBO after `NaturalGradient` and `Adam` optimization:
 
 # %%
-np.average([svgp_natgrad.elbo(next(data_minibatch_it)) for _ in ci_range(100)])
+average_minibatch_elbo(svgp_natgrad, data_t_float32, ci_niter(100)).numpy()
+
+# %%
+gpflow.config.set_config(float64_config)
 
 # %% [markdown]
 # ### Comparison with ordinary gradients in the non-conjugate case
@@ -288,7 +425,7 @@ np.average([svgp_natgrad.elbo(next(data_minibatch_it)) for _ in ci_range(100)])
 # We can use natural gradients even when the likelihood isn't Gaussian. It isn't guaranteed to be better, but it usually is better in practical situations.
 
 # %%
-y_binary = np.random.choice([1.0, -1], size=x.shape)
+y_binary = (2 * np.random.randint(0, 2, size=x.shape, dtype=np.int8) - 1).astype(np.float64)
 vgp_data = (x, y_binary)
 
 vgp_bernoulli = VGP(
@@ -308,20 +445,40 @@ set_trainable(vgp_bernoulli_natgrad.q_sqrt, False)
 
 # Create the optimize_tensors for VGP with natural gradients
 natgrad_adam_opt = tf.optimizers.Adam(adam_learning_rate)
-natgrad_opt = NaturalGradient(gamma=0.1)
-variational_params = [(vgp_bernoulli_natgrad.q_mu, vgp_bernoulli_natgrad.q_sqrt)]
+natgrad_opt.gamma.assign(0.1)
 
 # %%
-# Optimize vgp_bernoulli
-for _ in range(ci_niter(100)):
+def vgp_bernoulli_step():
     adam_opt.minimize(vgp_bernoulli.training_loss, var_list=vgp_bernoulli.trainable_variables)
 
-# Optimize vgp_bernoulli_natgrad
-for _ in range(ci_niter(100)):
-    adam_opt.minimize(
-        vgp_bernoulli_natgrad.training_loss, var_list=vgp_bernoulli_natgrad.trainable_variables
+
+def vgp_bernoulli_natgrad_step():
+    return joint_step(
+        vgp_bernoulli_natgrad.training_loss,
+        natgrad_opt,
+        natgrad_adam_opt,
+        [(vgp_bernoulli_natgrad.q_mu, vgp_bernoulli_natgrad.q_sqrt)],
+        vgp_bernoulli_natgrad.trainable_variables,
     )
-    natgrad_opt.minimize(vgp_bernoulli_natgrad.training_loss, var_list=variational_params)
+
+
+@tf.function
+def vgp_bernoulli_loop(num_steps):
+    for _ in tf.range(num_steps):
+        vgp_bernoulli_step()
+
+
+@tf.function
+def vgp_bernoulli_natgrad_loop(num_steps):
+    for _ in tf.range(num_steps):
+        vgp_bernoulli_natgrad_step()
+
+
+# Optimize vgp_bernoulli
+vgp_bernoulli_loop(ci_niter(100))
+
+# Optimize vgp_bernoulli_natgrad
+vgp_bernoulli_natgrad_loop(ci_niter(100))
 
 # %% [markdown]
 # VGP ELBO after ordinary `Adam` optimization:
@@ -350,21 +507,27 @@ set_trainable(vgp_bernoulli_natgrads_xi.q_sqrt, False)
 
 # Create the optimize_tensors for VGP with Bernoulli likelihood
 adam_opt = tf.optimizers.Adam(adam_learning_rate)
-natgrad_opt = NaturalGradient(gamma=0.01)
-
-variational_params = [
-    (vgp_bernoulli_natgrads_xi.q_mu, vgp_bernoulli_natgrads_xi.q_sqrt, XiSqrtMeanVar())
-]
+natgrad_opt.gamma.assign(0.01)
 
 # %%
-# Optimize vgp_bernoulli_natgrads_xi
-for _ in range(ci_niter(100)):
-    adam_opt.minimize(
+def vgp_bernoulli_natgrads_xi_step():
+    return joint_step(
         vgp_bernoulli_natgrads_xi.training_loss,
-        var_list=vgp_bernoulli_natgrads_xi.trainable_variables,
+        natgrad_opt,
+        adam_opt,
+        [(vgp_bernoulli_natgrads_xi.q_mu, vgp_bernoulli_natgrads_xi.q_sqrt, XiSqrtMeanVar())],
+        vgp_bernoulli_natgrads_xi.trainable_variables,
     )
 
-    natgrad_opt.minimize(vgp_bernoulli_natgrads_xi.training_loss, var_list=variational_params)
+
+@tf.function
+def vgp_bernoulli_natgrads_xi_loop(num_steps):
+    for _ in tf.range(num_steps):
+        vgp_bernoulli_natgrads_xi_step()
+
+
+# Optimize vgp_bernoulli_natgrads_xi
+vgp_bernoulli_natgrads_xi_loop(ci_niter(100))
 
 # %% [markdown]
 # VGP ELBO after `NaturalGradient` with `XiSqrtMeanVar` + `Adam` optimization:
@@ -96,7 +96,7 @@ plt.plot(X, Y, "xk")
 plt.show()
 
 # %% [markdown]
-# Working with TensorFlow Datasets is an efficient way to rapidly shuffle, iterate, and batch from data. For `prefetch` size we use `tf.data.experimental.AUTOTUNE` as recommended by TensorFlow [guidelines](https://www.tensorflow.org/guide/data_performance).
+# Working with TensorFlow Datasets is an efficient way to rapidly shuffle, iterate, and batch from data. We prefetch at the end of the pipeline, so that the next minibatch is prepared while the current one is being used for training. For `prefetch` size we use `tf.data.experimental.AUTOTUNE` as recommended by TensorFlow [guidelines](https://www.tensorflow.org/guide/data_performance).
 
 # %%
 train_dataset = tf.data.Dataset.from_tensor_slices((X, Y))
@@ -111,9 +111,9 @@ num_batches_per_epoch = num_train_data // batch_size
 original_train_dataset = train_dataset
 train_dataset = (
     train_dataset.repeat()
-    .prefetch(prefetch_size)
     .shuffle(buffer_size=shuffle_buffer_size)
     .batch(batch_size)
+    .prefetch(prefetch_size)
 )
 
 print(f"prefetch_size={prefetch_size}")
@@ -8,6 +8,6 @@ from . import sample_conditionals
 from . import multioutput
 
 
-from .util import base_conditional
+from .util import base_conditional, base_conditional_with_lm
 
 from .uncertain_conditionals import uncertain_conditional
@@ -38,6 +38,38 @@ def base_conditional(
     :param white: bool
     :return: [N, R]  or [R, N, N]
     """
+    Lm = tf.linalg.cholesky(Kmm)
+    return base_conditional_with_lm(
+        Kmn=Kmn, Lm=Lm, Knn=Knn, f=f, full_cov=full_cov, q_sqrt=q_sqrt, white=white
+    )
+
+
+def base_conditional_with_lm(
+    Kmn: tf.Tensor,
+    Lm: tf.Tensor,
+    Knn: tf.Tensor,
+    f: tf.Tensor,
+    *,
+    full_cov=False,
+    q_sqrt: Optional[tf.Tensor] = None,
+    white=False,
+):
+    r"""
+    Has the same functionality as the `base_conditional` function, except that instead of
+    `Kmm` this function accepts its Cholesky decomposition `Lm`. This allows the
+    decomposition to be computed once and reused, e.g. when the kernel hyperparameters
+    and inducing inputs are held fixed across several evaluations.
+
+    :param Kmn: [M, ..., N]
+    :param Lm: [M, M], lower-triangular Cholesky factor of Kmm
+    :param Knn: [..., N, N]  or  N
+    :param f: [M, R]
+    :param full_cov: bool
+    :param q_sqrt: If this is a Tensor, it must have shape [R, M, M] (lower
+        triangular) or [M, R] (diagonal)
+    :param white: bool
+    :return: [N, R]  or [R, N, N]
+    """
     # compute kernel stuff
     num_func = tf.shape(f)[-1]  # R
     N = tf.shape(Kmn)[-1]
@@ -58,7 +90,7 @@ def base_conditional(
 
     shape_constraints = [
         (Kmn, [..., "M", "N"]),
-        (Kmm, ["M", "M"]),
+        (Lm, ["M", "M"]),
         (Knn, [..., "N", "N"] if full_cov else [..., "N"]),
         (f, ["M", "R"]),
     ]
@@ -68,14 +100,13 @@ def base_conditional(
         )
     tf.debugging.assert_shapes(
         shape_constraints,
-        message="base_conditional() arguments "
+        message="base_conditional_with_lm() arguments "
         "[Note that this check verifies the shape of an alternative "
         "representation of Kmn. See the docs for the actual expected "
         "shape.]",
     )
 
     leading_dims = tf.shape(Kmn)[:-2]
-    Lm = tf.linalg.cholesky(Kmm)  # [M, M]
 
     # Compute the projection matrix A
     Lm = tf.broadcast_to(Lm, tf.concat([leading_dims, tf.shape(Lm)], 0))  # [..., M, M]
@@ -129,7 +160,9 @@ def base_conditional(
         (fmean, [..., "N", "R"]),
         (fvar, [..., "R", "N", "N"] if full_cov else [..., "N", "R"]),
     ]
-    tf.debugging.assert_shapes(shape_constraints, message="base_conditional() return values")
+    tf.debugging.assert_shapes(
+        shape_constraints, message="base_conditional_with_lm() return values"
+    )
 
     return fmean, fvar
 
@@ -20,6 +20,7 @@ import numpy as np
 import tensorflow as tf
 
 from ..base import Parameter, _to_constrained
+from ..config import default_float
 
 Scalar = Union[float, tf.Tensor, np.ndarray]
 LossClosure = Callable[[], tf.Tensor]
@@ -146,13 +147,19 @@ class NaturalGradient(tf.optimizers.Optimizer):
 
     def __init__(self, gamma: Scalar, xi_transform: XiTransform = XiNat(), name=None):
         """
-        :param gamma: natgrad step length
+        :param gamma: natgrad step length. Like the learning rate of other TensorFlow optimizers,
+            it can be passed as a tf.Variable, or changed later by assigning to `self.gamma`,
+            without having to re-trace compiled optimization steps. A gamma that is not a
+            tensor is stored in a variable of dtype `default_float()`, which `self.gamma` returns.
         :param xi_transform: default ξ transform (can be overridden in the call to minimize())
             The XiNat default choice works well in general.
         """
         name = self.__class__.__name__ if name is None else name
         super().__init__(name)
-        self.gamma = gamma
+        if not tf.is_tensor(gamma):
+            # Keras would create the hyperparameter variable as float32, losing precision
+            gamma = tf.Variable(gamma, dtype=default_float(), trainable=False, name="gamma")
+        self._set_hyper("gamma", gamma)
         self.xi_transform = xi_transform
 
     def minimize(
@@ -272,15 +279,21 @@ class NaturalGradient(tf.optimizers.Optimizer):
         dL_dmean = _to_constrained(q_mu_grad, q_mu.transform)
         dL_dvarsqrt = _to_constrained(q_sqrt_grad, q_sqrt.transform)
 
-        with tf.GradientTape(persistent=True, watch_accessed_variables=False) as tape:
-            tape.watch([q_mu.unconstrained_variable, q_sqrt.unconstrained_variable])
-
-            # the three parameterizations as functions of [q_mu, q_sqrt]
-            eta1, eta2 = meanvarsqrt_to_expectation(q_mu, q_sqrt)
-            # we need these to calculate the relevant gradients
-            meanvarsqrt = expectation_to_meanvarsqrt(eta1, eta2)
+        # 2) the chain rule to get ∂L/∂η, where η (eta) are the expectation parameters
+        dL_deta1, dL_deta2 = _meanvarsqrt_to_expectation_gradient(
+            q_mu, q_sqrt, dL_dmean, dL_dvarsqrt
+        )
 
-            if not isinstance(xi_transform, XiNat):
+        # 3) the forward-mode derivative of ξ(θ) in the direction of ∂L/∂η
+        if isinstance(xi_transform, XiNat):
+            nat_dL_xi1, nat_dL_xi2 = dL_deta1, dL_deta2
+        elif isinstance(xi_transform, XiSqrtMeanVar):
+            nat_dL_xi1, nat_dL_xi2 = _meanvarsqrt_natural_gradient(
+                q_mu, q_sqrt, dL_deta1, dL_deta2
+            )
+        else:
+            with tf.GradientTape(persistent=True, watch_accessed_variables=False) as tape:
+                tape.watch([q_mu.unconstrained_variable, q_sqrt.unconstrained_variable])
                 nat1, nat2 = meanvarsqrt_to_natural(q_mu, q_sqrt)
                 xi1_nat, xi2_nat = xi_transform.naturals_to_xi(nat1, nat2)
                 dummy_tensors = tf.ones_like(xi1_nat), tf.ones_like(xi2_nat)
@@ -290,23 +303,15 @@ class NaturalGradient(tf.optimizers.Optimizer):
                         [xi1_nat, xi2_nat], [nat1, nat2], output_gradients=dummy_tensors
                     )
 
-        # 2) the chain rule to get ∂L/∂η, where η (eta) are the expectation parameters
-        dL_deta1, dL_deta2 = tape.gradient(
-            meanvarsqrt, [eta1, eta2], output_gradients=[dL_dmean, dL_dvarsqrt]
-        )
-
-        if not isinstance(xi_transform, XiNat):
             nat_dL_xi1, nat_dL_xi2 = forward_tape.gradient(
                 dummy_gradients, dummy_tensors, output_gradients=[dL_deta1, dL_deta2]
             )
-        else:
-            nat_dL_xi1, nat_dL_xi2 = dL_deta1, dL_deta2
-
-        del tape  # Remove "persistent" tape
+            del tape  # Remove "persistent" tape
 
+        gamma = self._get_hyper("gamma", dL_dmean.dtype)
         xi1, xi2 = xi_transform.meanvarsqrt_to_xi(q_mu, q_sqrt)
-        xi1_new = xi1 - self.gamma * nat_dL_xi1
-        xi2_new = xi2 - self.gamma * nat_dL_xi2
+        xi1_new = xi1 - gamma * nat_dL_xi1
+        xi2_new = xi2 - gamma * nat_dL_xi2
 
         # Transform back to the model parameters [q_mu, q_sqrt]
         mean_new, varsqrt_new = xi_transform.xi_to_meanvarsqrt(xi1_new, xi2_new)
@@ -357,13 +362,16 @@ def swap_dimensions(method):
 
 @swap_dimensions
 def natural_to_meanvarsqrt(nat1: tf.Tensor, nat2: tf.Tensor):
-    var_sqrt_inv = tf.linalg.cholesky(-2 * nat2)
-    var_sqrt = _inverse_lower_triangular(var_sqrt_inv)
-    S = tf.linalg.matmul(var_sqrt, var_sqrt, transpose_a=True)
-    mu = tf.linalg.matmul(S, nat1)
-    # We need the decomposition of S as L L^T, not as L^T L,
-    # hence we need another cholesky.
-    return mu, tf.linalg.cholesky(S)
+    # We need the decomposition of S as L L^T. Instead of inverting the precision -2 nat2 and
+    # taking another cholesky, we decompose the precision as U U^T with U upper triangular, by
+    # taking the cholesky of the precision with rows and columns in reversed order and reversing
+    # the factor back. Then S = U^-T U^-1, where U^-T is lower triangular, i.e. L = U^-T.
+    precision_reversed = tf.reverse(-2 * nat2, axis=[-2, -1])
+    var_sqrt_inv_reversed = tf.linalg.cholesky(precision_reversed)
+    var_sqrt_reversed = _inverse_lower_triangular(var_sqrt_inv_reversed)
+    var_sqrt = tf.reverse(tf.linalg.adjoint(var_sqrt_reversed), axis=[-2, -1])
+    mu = tf.linalg.matmul(var_sqrt, tf.linalg.matmul(var_sqrt, nat1, transpose_a=True))
+    return mu, var_sqrt
 
 
 @swap_dimensions
@@ -397,6 +405,72 @@ def meanvarsqrt_to_expectation(m: tf.Tensor, v_sqrt: tf.Tensor):
     return m, v + tf.linalg.matmul(m, m, transpose_b=True)
 
 
+def _meanvarsqrt_to_expectation_gradient(
+    mean: tf.Tensor, varsqrt: tf.Tensor, dL_dmean: tf.Tensor, dL_dvarsqrt: tf.Tensor
+):
+    """
+    Backpropagates the gradients w.r.t. [mean, varsqrt] to the expectation parameters
+    η₁ = mean, η₂ = S + mean meanᵀ, where S = varsqrt varsqrtᵀ is the covariance. This is the
+    reverse-mode derivative of expectation_to_meanvarsqrt, written out so that it reuses the
+    current Cholesky factor varsqrt instead of recomputing it from η:
+
+        ∂L/∂S = sym(varsqrt⁻ᵀ Φ(varsqrtᵀ ∂L/∂varsqrt) varsqrt⁻¹),
+        ∂L/∂η₂ = ∂L/∂S,  ∂L/∂η₁ = ∂L/∂mean - 2 (∂L/∂S) mean,
+
+    where Φ takes the lower triangle and halves the diagonal, and sym(A) = ½(A + Aᵀ).
+
+    :param mean: the mean parameter [N, D]
+    :param varsqrt: the lower-triangular varsqrt parameter [D, N, N]
+    :param dL_dmean: gradient of the loss w.r.t. the mean [N, D]
+    :param dL_dvarsqrt: gradient of the loss w.r.t. varsqrt [D, N, N]
+    :return: tuple of the gradients w.r.t. η₁ and η₂, [N, D] and [D, N, N]
+    """
+    m_dn1 = tf.linalg.adjoint(mean)[:, :, None]
+    dL_dm_dn1 = tf.linalg.adjoint(dL_dmean)[:, :, None]
+
+    middle = tf.linalg.matmul(varsqrt, dL_dvarsqrt, transpose_a=True)
+    phi = tf.linalg.band_part(middle, -1, 0) - 0.5 * tf.linalg.diag(tf.linalg.diag_part(middle))
+    varsqrt_inv = _inverse_lower_triangular(varsqrt)
+    dL_dS = tf.linalg.matmul(varsqrt_inv, tf.linalg.matmul(phi, varsqrt_inv), transpose_a=True)
+    dL_dS = 0.5 * (dL_dS + tf.linalg.adjoint(dL_dS))
+
+    dL_deta1_dn1 = dL_dm_dn1 - 2 * tf.linalg.matmul(dL_dS, m_dn1)
+    return tf.linalg.adjoint(dL_deta1_dn1[:, :, 0]), dL_dS
+
+
+def _meanvarsqrt_natural_gradient(
+    mean: tf.Tensor, varsqrt: tf.Tensor, dL_deta1: tf.Tensor, dL_deta2: tf.Tensor
+):
+    """
+    Natural gradient in the ξ = [mean, varsqrt] parameterization, i.e. the directional
+    derivative of natural_to_meanvarsqrt at the current natural parameters θ in the direction
+    of the expectation gradient [a, B] = [∂L/∂η₁, ∂L/∂η₂]. With S = L Lᵀ and θ₂ = -½S⁻¹,
+
+        dS = 2 S B S,  d(mean) = S a + 2 S B mean,  d(varsqrt) = L Φ(2 Lᵀ B L),
+
+    where Φ takes the lower triangle and halves the diagonal. This only needs matrix
+    products, instead of differentiating through natural_to_meanvarsqrt with forward mode.
+
+    :param mean: the mean parameter [N, D]
+    :param varsqrt: the lower-triangular varsqrt parameter [D, N, N]
+    :param dL_deta1: gradient of the loss w.r.t. η₁ [N, D]
+    :param dL_deta2: gradient of the loss w.r.t. η₂ [D, N, N]
+    :return: tuple of the natural gradients w.r.t. mean and varsqrt, [N, D] and [D, N, N]
+    """
+    m_dn1 = tf.linalg.adjoint(mean)[:, :, None]
+    a_dn1 = tf.linalg.adjoint(dL_deta1)[:, :, None]
+    B_dnn = 0.5 * (dL_deta2 + tf.linalg.adjoint(dL_deta2))
+
+    S_dnn = tf.linalg.matmul(varsqrt, varsqrt, transpose_b=True)
+    dmean_dn1 = tf.linalg.matmul(S_dnn, a_dn1 + 2 * tf.linalg.matmul(B_dnn, m_dn1))
+
+    LtBL = tf.linalg.matmul(varsqrt, tf.linalg.matmul(B_dnn, varsqrt), transpose_a=True)
+    phi = 2 * tf.linalg.band_part(LtBL, -1, 0) - tf.linalg.diag(tf.linalg.diag_part(LtBL))
+    dvarsqrt_dnn = tf.linalg.matmul(varsqrt, phi)
+
+    return tf.linalg.adjoint(dmean_dn1[:, :, 0]), dvarsqrt_dnn
+
+
 def _inverse_lower_triangular(M):
     """
     Take inverse of lower triangular (e.g. Cholesky) matrix. This function
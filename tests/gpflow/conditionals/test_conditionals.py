@@ -90,6 +90,30 @@ def test_whiten(Xdata, Xnew, kernel, mu, sqrt):
     assert_allclose(var1, var2)
 
 
+@pytest.mark.parametrize("white", [True, False])
+@pytest.mark.parametrize("full_cov", [True, False])
+def test_base_conditional_with_lm(Xdata, Xnew, kernel, mu, white, full_cov):
+    """
+    Make sure that passing the precomputed Cholesky factor of Kmm to
+    base_conditional_with_lm gives the same result as base_conditional.
+    """
+    q_sqrt = tf.convert_to_tensor(np.tril(rng.randn(Ln, Nn, Nn)))
+    Kmm = kernel(Xdata) + tf.eye(Nn, dtype=default_float()) * 1e-6
+    Kmn = kernel(Xdata, Xnew)
+    Knn = kernel(Xnew, full_cov=full_cov)
+    Lm = tf.linalg.cholesky(Kmm)
+
+    mean1, var1 = gpflow.conditionals.base_conditional(
+        Kmn, Kmm, Knn, mu, full_cov=full_cov, q_sqrt=q_sqrt, white=white
+    )
+    mean2, var2 = gpflow.conditionals.base_conditional_with_lm(
+        Kmn, Lm, Knn, mu, full_cov=full_cov, q_sqrt=q_sqrt, white=white
+    )
+
+    assert_allclose(mean1, mean2)
+    assert_allclose(var1, var2)
+
+
 def test_gaussian_whiten(Xdata, Xnew, kernel, mu, sqrt):
     """
     Make sure that predicting using the whitened representation is the
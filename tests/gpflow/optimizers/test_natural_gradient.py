@@ -151,6 +151,125 @@ def test_svgp_vs_sgpr(sgpr_and_svgp):
     assert_sgpr_vs_svgp(sgpr, svgp)
 
 
+def test_gamma_can_be_updated():
+    """
+    gamma is a hyperparameter of the optimizer, so it can be changed after construction,
+    either by assigning to the attribute or to a tf.Variable passed in as gamma.
+    """
+    opt = NaturalGradient(gamma=1.0)
+    assert opt.gamma.dtype == default_float()
+    assert opt.get_config()["gamma"] == 1.0
+    opt.gamma = 0.1
+    assert opt.get_config()["gamma"] == 0.1
+
+    gamma = tf.Variable(1.0, dtype=default_float())
+    opt = NaturalGradient(gamma=gamma)
+    gamma.assign(0.1)
+    np.testing.assert_allclose(opt.get_config()["gamma"], 0.1)
+
+
+def test_compiled_step_uses_updated_gamma():
+    """
+    A compiled natgrad step should pick up a new gamma without being re-traced. With XiNat, the
+    step moves the natural parameters by -gamma ∂L/∂η, so after reassigning gamma the change of
+    the natural parameters should be gamma times that of a gamma=1 step from the same state.
+    """
+    rng = np.random.RandomState(0)
+    M, L = 3, 2
+    target = rng.randn(M, L)
+    q_mu = gpflow.Parameter(rng.randn(M, L))
+    q_sqrt = gpflow.Parameter(
+        np.tril(rng.randn(L, M, M), -1) + 2 * np.eye(M), transform=gpflow.utilities.triangular()
+    )
+
+    def loss(q_mu, q_sqrt):
+        # KL divergence (up to a constant) from q(u) = N(q_mu, q_sqrt q_sqrtᵀ) to N(target, I)
+        return (
+            0.5 * tf.reduce_sum((q_mu - target) ** 2)
+            + 0.5 * tf.reduce_sum(q_sqrt ** 2)
+            - tf.reduce_sum(tf.math.log(tf.linalg.diag_part(q_sqrt)))
+        )
+
+    def natural_parameters(q_mu, q_sqrt):
+        return gpflow.optimizers.natgrad.meanvarsqrt_to_natural(
+            tf.convert_to_tensor(q_mu), tf.convert_to_tensor(q_sqrt)
+        )
+
+    opt = NaturalGradient(gamma=1.0)
+    num_traces = []
+
+    @tf.function
+    def step():
+        num_traces.append(1)
+        opt.minimize(lambda: loss(q_mu, q_sqrt), [(q_mu, q_sqrt)])
+
+    step()
+    opt.gamma = 0.1
+    nat_before = natural_parameters(q_mu, q_sqrt)
+
+    # reference step with gamma=1 from the same state
+    q_mu_ref = gpflow.Parameter(q_mu.numpy())
+    q_sqrt_ref = gpflow.Parameter(q_sqrt.numpy(), transform=gpflow.utilities.triangular())
+    NaturalGradient(gamma=1.0).minimize(
+        lambda: loss(q_mu_ref, q_sqrt_ref), [(q_mu_ref, q_sqrt_ref)]
+    )
+    nat_ref = natural_parameters(q_mu_ref, q_sqrt_ref)
+
+    step()
+    assert len(num_traces) == 1
+    nat_after = natural_parameters(q_mu, q_sqrt)
+    for before, after, ref in zip(nat_before, nat_after, nat_ref):
+        np.testing.assert_allclose(after - before, 0.1 * (ref - before), atol=1e-12)
+
+
+def test_natural_to_meanvarsqrt():
+    """
+    Check that natural_to_meanvarsqrt recovers the mean and the lower-triangular
+    Cholesky factor of the covariance from the natural parameters.
+    """
+    rng = np.random.RandomState(0)
+    L, M = 2, 5
+    mean = rng.randn(M, L)
+    A = rng.randn(L, M, M)
+    cov = A @ np.transpose(A, (0, 2, 1)) + 0.1 * np.eye(M)
+    precision = np.linalg.inv(cov)
+    nat1 = np.einsum("lmn,nl->ml", precision, mean)
+    nat2 = -0.5 * precision
+
+    mean_new, varsqrt_new = gpflow.optimizers.natgrad.natural_to_meanvarsqrt(
+        tf.convert_to_tensor(nat1), tf.convert_to_tensor(nat2)
+    )
+
+    np.testing.assert_allclose(mean_new, mean)
+    np.testing.assert_allclose(varsqrt_new, np.linalg.cholesky(cov))
+
+
+def test_meanvarsqrt_to_expectation_gradient():
+    """
+    Check the closed-form backpropagation of gradients from [mean, varsqrt] to the
+    expectation parameters against automatic differentiation of expectation_to_meanvarsqrt.
+    """
+    rng = np.random.RandomState(0)
+    L, M = 2, 5
+    mean = tf.convert_to_tensor(rng.randn(M, L))
+    A = rng.randn(L, M, M)
+    varsqrt = tf.convert_to_tensor(np.linalg.cholesky(A @ np.transpose(A, (0, 2, 1)) + np.eye(M)))
+    dL_dmean = tf.convert_to_tensor(rng.randn(M, L))
+    dL_dvarsqrt = tf.convert_to_tensor(np.tril(rng.randn(L, M, M)))
+
+    eta1, eta2 = gpflow.optimizers.natgrad.meanvarsqrt_to_expectation(mean, varsqrt)
+    with tf.GradientTape() as tape:
+        tape.watch([eta1, eta2])
+        meanvarsqrt = gpflow.optimizers.natgrad.expectation_to_meanvarsqrt(eta1, eta2)
+    expected = tape.gradient(meanvarsqrt, [eta1, eta2], output_gradients=[dL_dmean, dL_dvarsqrt])
+
+    dL_deta1, dL_deta2 = gpflow.optimizers.natgrad._meanvarsqrt_to_expectation_gradient(
+        mean, varsqrt, dL_dmean, dL_dvarsqrt
+    )
+    np.testing.assert_allclose(dL_deta1, expected[0])
+    np.testing.assert_allclose(dL_deta2, expected[1])
+
+
 class XiEta(gpflow.optimizers.XiTransform):
     @staticmethod
     def meanvarsqrt_to_xi(mean: tf.Tensor, varsqrt: tf.Tensor) -> tf.Tensor:
@@ -165,6 +284,48 @@ class XiEta(gpflow.optimizers.XiTransform):
         return gpflow.optimizers.natgrad.natural_to_expectation(nat1, nat2)
 
 
+class XiSqrtMeanVarAutodiff(gpflow.optimizers.XiTransform):
+    """
+    Same transform as XiSqrtMeanVar, but not recognised by NaturalGradient, so that the
+    natural gradient is computed by the generic forward-mode autodiff path.
+    """
+
+    meanvarsqrt_to_xi = staticmethod(gpflow.optimizers.XiSqrtMeanVar.meanvarsqrt_to_xi)
+    xi_to_meanvarsqrt = staticmethod(gpflow.optimizers.XiSqrtMeanVar.xi_to_meanvarsqrt)
+    naturals_to_xi = staticmethod(gpflow.optimizers.XiSqrtMeanVar.naturals_to_xi)
+
+
+def test_xi_sqrt_mean_var_closed_form_matches_autodiff():
+    """
+    The closed-form natural gradient step for XiSqrtMeanVar should agree with the
+    generic forward-mode computation for the same transform.
+    """
+    rng = np.random.RandomState(0)
+    L, M = 2, 4
+    q_mu_value = rng.randn(M, L)
+    A = rng.randn(L, M, M)
+    q_sqrt_value = np.linalg.cholesky(A @ np.transpose(A, (0, 2, 1)) + np.eye(M))
+    target = rng.randn(M, L)
+
+    def step(xi_transform):
+        q_mu = gpflow.Parameter(q_mu_value)
+        q_sqrt = gpflow.Parameter(q_sqrt_value, transform=gpflow.utilities.triangular())
+
+        def loss():
+            var = tf.linalg.diag_part(tf.linalg.matmul(q_sqrt, q_sqrt, transpose_b=True))
+            return tf.reduce_sum((q_mu - target) ** 2 * tf.linalg.adjoint(var)) + tf.reduce_sum(
+                q_sqrt ** 4
+            )
+
+        NaturalGradient(gamma=0.1).minimize(loss, [(q_mu, q_sqrt, xi_transform)])
+        return q_mu.numpy(), q_sqrt.numpy()
+
+    q_mu_closed_form, q_sqrt_closed_form = step(gpflow.optimizers.XiSqrtMeanVar())
+    q_mu_autodiff, q_sqrt_autodiff = step(XiSqrtMeanVarAutodiff())
+    np.testing.assert_allclose(q_mu_closed_form, q_mu_autodiff)
+    np.testing.assert_allclose(q_sqrt_closed_form, q_sqrt_autodiff)
+
+
 @pytest.mark.parametrize("xi_transform", [gpflow.optimizers.XiSqrtMeanVar(), XiEta()])
 def test_xi_transform_vgp_vs_gpr(gpr_and_vgp, xi_transform):
     """